@@ -6,6 +6,7 @@ Usage:
     python examples/quick_start.py
 """
 
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -25,8 +26,11 @@ def main():
     logger.info("GraphRAG Quick-Start")
     logger.info("=" * 80)
     
+    cfg = PipelineConfig()
+
     # Verify environment
-    required_vars = ["NEO4J_PASSWORD", "GEMINI_API_KEY"]
+    api_key_vars = {"openai": ["OPENAI_API_KEY"], "gemini": ["GEMINI_API_KEY"], "stub": []}
+    required_vars = ["NEO4J_PASSWORD"] + api_key_vars.get(cfg.generation.backend, [])
     missing = [v for v in required_vars if not os.getenv(v)]
     if missing:
         logger.error(f"Missing environment variables: {', '.join(missing)}")
@@ -38,7 +42,6 @@ def main():
     logger.info("✓ All required env vars set")
     
     # Init pipeline
-    cfg = PipelineConfig()
     pipeline = GraphRAGPipeline(cfg)
     
     # Verify Neo4j
@@ -93,13 +96,15 @@ def main():
     logger.info("Testing Retrieval & Generation")
     logger.info("=" * 80)
     
-    for query in queries:
+    try:
+        answers = asyncio.run(pipeline.answer_many(queries))
+    except Exception as e:
+        logger.error(f"✗ Generation failed: {e}")
+        answers = []
+
+    for query, answer in zip(queries, answers):
         logger.info(f"\nQuery: {query}")
-        try:
-            answer = pipeline.answer(query)
-            logger.info(f"Answer: {answer}")
-        except Exception as e:
-            logger.error(f"✗ Generation failed: {e}")
+        logger.info(f"Answer: {answer}")
     
     logger.info("\n" + "=" * 80)
     logger.info("✓ Quick-start complete!")
@@ -39,6 +39,7 @@ def validate_pipeline(config_path: str, data_dir: str) -> bool:
     if not pipeline.graph_store.verify_connection():
         logger.error("Neo4j connection failed")
         return False
+    pipeline.graph_store.check_database()
     
     # Find sample docs
     data_path = Path(data_dir)
@@ -83,7 +84,12 @@ def validate_pipeline(config_path: str, data_dir: str) -> bool:
     logger.info(f"Testing retrieval & generation with query: '{query}'")
     
     try:
-        answer = pipeline.answer(query)
+        pieces = []
+        for piece in pipeline.answer_stream(query):
+            print(piece, end="", flush=True)
+            pieces.append(piece)
+        print()
+        answer = "".join(pieces)
         logger.info(f"Answer: {answer[:200]}...")
         
         if "No supporting context" in answer:
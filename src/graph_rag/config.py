@@ -2,14 +2,15 @@ from dataclasses import dataclass, field
 from typing import List, Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class EmbeddingConfig:
-    model_name: str = "all-mpnet-base-v2"
+    model_name: str = "all-MiniLM-L6-v2"
     device: str = "cpu"
-    dim: int = 768
+    dim: int = 384
+    quantize: bool = False  # dynamic int8 quantization of Linear layers (CPU only)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GraphConfig:
     uri: str = "bolt://localhost:7687"
     user: str = "neo4j"
@@ -18,21 +19,41 @@ class GraphConfig:
     max_hops: int = 2
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RetrievalConfig:
     top_k_vectors: int = 10
     top_k_graph: int = 10
     alpha_semantic: float = 0.6  # blend between semantic and graph scores 
+    top_k_merged: Optional[int] = None  # merged hits passed to reranking; None keeps all
+    # "auto": exact flat search below ann_min_vectors, HNSW above;
+    # or force "flat" | "hnsw" | "ivf" | "ivfpq" | "sq" | "hnsw_sq".
+    index_type: str = "auto"
+    ann_min_vectors: int = 10000
+    nprobe: int = 16  # IVF lists probed per query
+    pq_m: Optional[int] = None  # PQ sub-quantizers for "ivfpq"; None -> dim // 8
+    pq_nbits: int = 8
+    sq_type: str = "8bit"  # scalar quantizer for "sq" / "hnsw_sq": "8bit" | "fp16"
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    search_shards: Optional[int] = None  # exact-search row shards scanned in parallel; None -> per core
+    add_batch_size: int = 10000  # queued chunks are encoded and added to FAISS in blocks this large
+    expected_chunks: int = 0  # capacity reserved up front for the exact-search matrix
+    index_path: Optional[str] = None  # directory the index is saved to after a build and loaded from at startup
+    query_cache_size: int = 1024  # query embeddings kept in the LRU cache; 0 disables it
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GenerationConfig:
-    model_name: str = "gpt-4o-mini"
+    backend: str = "openai"  # "openai" | "gemini" | "stub"
+    model_name: Optional[str] = None  # None -> backend default (gpt-4o-mini / gemini-2.0-flash)
     max_tokens: int = 512
     temperature: float = 0.2
+    max_context_tokens: int = 8000  # token budget for retrieved context in the prompt
+    top_k: int = 10  # reranked chunks handed to the generator
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PipelineConfig:
     embedding: EmbeddingConfig = field(default_factory=EmbeddingConfig)
     graph: GraphConfig = field(default_factory=GraphConfig)
@@ -42,3 +63,8 @@ class PipelineConfig:
     chunk_overlap: int = 50
     allowed_formats: List[str] = field(default_factory=lambda: [".pdf", ".txt", ".md"])
     cache_dir: Optional[str] = None
+    pdf_executor: str = "process"  # "process" | "thread" pool for PDF parsing
+    ingest_workers: Optional[int] = None  # PDF-parsing workers; None -> cpu_count (processes) or 4x (threads)
+    # spaCy nlp.pipe workers; >1 starts a new worker pool per ingestion batch (1000 chunks in
+    # build_indexes), so it only pays off when NER dominates that start-up cost.
+    ner_processes: int = 1
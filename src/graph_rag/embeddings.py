@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import os
+import tempfile
 from typing import Iterable, List, Sequence
-from node2vec import Node2Vec
 import networkx as nx
+import numpy as np
 
 
 class TextEmbedder:
     """SentenceTransformer-backed text encoder."""
 
-    def __init__(self, model_name: str, device: str = "cpu", normalize: bool = True) -> None:
+    def __init__(
+        self, model_name: str, device: str = "cpu", normalize: bool = True, quantize: bool = False
+    ) -> None:
         self.model_name = model_name
         self.device = device
         self.normalize = normalize
+        self.quantize = quantize
         try:
             from sentence_transformers import SentenceTransformer
         except ImportError as exc:  # pragma: no cover - dependency guard
@@ -19,14 +24,36 @@ class TextEmbedder:
                 "sentence-transformers is required for TextEmbedder. Install with `pip install sentence-transformers`."
             ) from exc
         self._model = SentenceTransformer(model_name, device=device)
+        self._normalize_L2 = None
+        if normalize:
+            try:
+                from faiss import normalize_L2
+            except ImportError as exc:  # pragma: no cover - dependency guard
+                raise ImportError("faiss is required for TextEmbedder. Install with `pip install faiss-cpu`.") from exc
+            self._normalize_L2 = normalize_L2
+        if quantize and device == "cpu":
+            import torch
+
+            self._model = torch.quantization.quantize_dynamic(self._model, {torch.nn.Linear}, dtype=torch.qint8)
 
-    def encode(self, texts: Sequence[str]) -> List[List[float]]:
-        vectors = self._model.encode(list(texts), normalize_embeddings=self.normalize, convert_to_numpy=True)
-        return vectors.tolist()
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Encode texts into a C-contiguous float32 matrix of shape (n, dim)."""
+        vectors = self._model.encode(
+            list(texts),
+            normalize_embeddings=False,
+            convert_to_numpy=True,
+            batch_size=64 if self.device == "cpu" else 256,
+            show_progress_bar=False,
+        )
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self._normalize_L2 is not None:
+            # In-place over the whole matrix instead of per-batch torch normalization.
+            self._normalize_L2(vectors)
+        return vectors
 
 
 class GraphEmbedder:
-    """Node2Vec graph embedder using NetworkX walks + gensim model."""
+    """Node2Vec graph embedder using PecanPy compiled walks + gensim Word2Vec."""
 
     def __init__(
         self,
@@ -47,32 +74,48 @@ class GraphEmbedder:
         self._fit_nodes: List[str] = []
 
     def fit(self, graph: "nx.Graph") -> None:
-        # try:
-        #     from networkx.algorithms.node2vec import Node2Vec
-        # except ImportError as exc:  # pragma: no cover - dependency guard
-        #     raise ImportError("networkx>=2.6 is required for GraphEmbedder Node2Vec.") from exc
+        try:
+            from gensim.models import Word2Vec
+            from pecanpy.pecanpy import PreComp
+        except ImportError as exc:  # pragma: no cover - dependency guard
+            raise ImportError(
+                "pecanpy and gensim are required for GraphEmbedder. Install with `pip install pecanpy gensim`."
+            ) from exc
+
+        # PecanPy loads graphs from a weighted edge list; round-trip through a temp file.
+        with tempfile.NamedTemporaryFile("w", suffix=".edg", delete=False) as fh:
+            for u, v, data in graph.edges(data=True):
+                fh.write(f"{u}\t{v}\t{data.get('weight', 1.0)}\n")
+            edg_path = fh.name
+        try:
+            walker = PreComp(p=self.p, q=self.q, workers=self.workers, verbose=False)
+            walker.read_edg(edg_path, weighted=True, directed=graph.is_directed())
+        finally:
+            os.unlink(edg_path)
+        walker.preprocess_transition_probs()
+        walks = walker.simulate_walks(num_walks=self.num_walks, walk_length=self.walk_length)
 
-        node2vec = Node2Vec(
-            graph,
-            dimensions=self.dim,
-            walk_length=self.walk_length,
-            num_walks=self.num_walks,
-            p=self.p,
-            q=self.q,
+        self._model = Word2Vec(
+            walks,
+            vector_size=self.dim,
+            window=10,
+            min_count=1,
+            sg=1,
             workers=self.workers,
-            quiet=True,
+            batch_words=128,
         )
-        self._model = node2vec.fit(window=10, min_count=1, batch_words=128)
         self._fit_nodes = list(graph.nodes())
 
-    def encode_nodes(self, node_ids: Iterable[str]) -> List[List[float]]:
+    def encode_nodes(self, node_ids: Iterable[str]) -> np.ndarray:
+        """Return a (n, dim) float32 matrix; nodes unseen during `fit` get zero vectors."""
         if self._model is None:
             raise RuntimeError("GraphEmbedder must be fit on a graph before encoding nodes.")
 
-        vectors: List[List[float]] = []
-        for node_id in node_ids:
-            if node_id not in self._model.wv:  # type: ignore[attr-defined]
-                vectors.append([0.0] * self.dim)
-                continue
-            vectors.append(self._model.wv[node_id].tolist())  # type: ignore[attr-defined]
+        wv = self._model.wv  # type: ignore[attr-defined]
+        keys = list(node_ids)
+        mask = np.fromiter((k in wv for k in keys), dtype=bool, count=len(keys))
+        vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+        if mask.any():
+            rows = np.fromiter((wv.key_to_index[k] for k, m in zip(keys, mask) if m), dtype=np.int64)
+            vectors[mask] = wv.vectors[rows]
         return vectors
@@ -1,7 +1,11 @@
+import asyncio
+import hashlib
 import os
+import sqlite3
 from dataclasses import dataclass
-from typing import List
-from openai import OpenAI
+from typing import Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import orjson
 
 from .config import GenerationConfig
 from .rerank import RerankedResult
@@ -13,38 +17,223 @@ class GenerationResult:
     citations: List[str]
 
 
+class ResponseCache:
+    """SQLite-backed store of LLM answers keyed by a hash of (model, prompt, temperature)."""
+
+    def __init__(self, cache_dir: str) -> None:
+        cache_dir = os.path.expanduser(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "responses.sqlite"), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, answer TEXT NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model: str, prompt: str, temperature: float) -> str:
+        return hashlib.blake2b(f"{model}{prompt}{temperature}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT answer FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, answer: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO responses (key, answer) VALUES (?, ?)", (key, answer))
+        self._conn.commit()
+
+
 class Generator:
-    def __init__(self, config: GenerationConfig) -> None:
+    # Above this temperature outputs are too non-deterministic to be worth caching.
+    _CACHE_MAX_TEMPERATURE = 0.3
+
+    _DEFAULT_MODELS = {"openai": "gpt-4o-mini", "gemini": "gemini-2.0-flash", "stub": "stub"}
+
+    def __init__(self, config: GenerationConfig, cache_dir: Optional[str] = None) -> None:
         self.config = config
+        self.backend = config.backend
+        if self.backend not in self._DEFAULT_MODELS:
+            raise ValueError(f"Unknown generation backend: {self.backend}")
+        self.model_name = config.model_name or self._DEFAULT_MODELS[self.backend]
+        self._tokenizer = None
+
+        # Only the selected SDK is imported; each one adds noticeable import time and memory.
+        if self.backend == "openai":
+            from openai import AsyncOpenAI, OpenAI
+
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("Set OPENAI_API_KEY environment variable")
+            self.client = OpenAI(api_key=api_key)
+            self.aclient = AsyncOpenAI(api_key=api_key)
+        elif self.backend == "gemini":
+            from google import genai
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("Set OPENAI_API_KEY environment variable")
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise RuntimeError("Set GEMINI_API_KEY environment variable")
+            self.client = genai.Client(api_key=api_key)
+            self.aclient = self.client.aio
 
-        self.client = OpenAI(api_key=api_key)
+        self.cache: Optional[ResponseCache] = None
+        if self.backend != "stub" and config.temperature < self._CACHE_MAX_TEMPERATURE:
+            self.cache = ResponseCache(cache_dir or "~/.cache/graphrag")
 
-        # Cheap + fast, perfect for RAG
-        self.model_name = "gpt-4o-mini"
+    # --- Backends ---
+    def _gemini_config(self, json_output: bool = False):
+        from google.genai import types
 
-    def _build_context(self, reranked: RerankedResult, max_chars: int = 12000):
-        seen, parts, citations, total = set(), [], [], 0
+        return types.GenerateContentConfig(
+            temperature=self.config.temperature,
+            max_output_tokens=self.config.max_tokens,
+            response_mime_type="application/json" if json_output else None,
+        )
 
+    _OPENAI_JSON_FORMAT = {"format": {"type": "json_object"}}
+
+    def _complete(self, prompt: str) -> str:
+        """Return the raw JSON response text for a structured-output prompt."""
+        if self.backend == "openai":
+            response = self.client.responses.create(
+                model=self.model_name,
+                input=prompt,
+                temperature=self.config.temperature,
+                max_output_tokens=self.config.max_tokens,
+                text=self._OPENAI_JSON_FORMAT,
+            )
+            return response.output_text.strip()
+        if self.backend == "gemini":
+            response = self.client.models.generate_content(
+                model=self.model_name, contents=prompt, config=self._gemini_config(json_output=True)
+            )
+            return (response.text or "").strip()
+        return self._stub_answer(prompt)
+
+    async def _acomplete(self, prompt: str) -> str:
+        if self.backend == "openai":
+            response = await self.aclient.responses.create(
+                model=self.model_name,
+                input=prompt,
+                temperature=self.config.temperature,
+                max_output_tokens=self.config.max_tokens,
+                text=self._OPENAI_JSON_FORMAT,
+            )
+            return response.output_text.strip()
+        if self.backend == "gemini":
+            response = await self.aclient.models.generate_content(
+                model=self.model_name, contents=prompt, config=self._gemini_config(json_output=True)
+            )
+            return (response.text or "").strip()
+        return self._stub_answer(prompt)
+
+    def _stream(self, prompt: str) -> Iterator[str]:
+        if self.backend == "openai":
+            stream = self.client.responses.create(
+                model=self.model_name,
+                input=prompt,
+                temperature=self.config.temperature,
+                max_output_tokens=self.config.max_tokens,
+                stream=True,
+            )
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+        elif self.backend == "gemini":
+            stream = self.client.models.generate_content_stream(
+                model=self.model_name, contents=prompt, config=self._gemini_config()
+            )
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        else:
+            yield self._stub_answer(prompt)
+
+    @staticmethod
+    def _stub_answer(prompt: str) -> str:
+        """Offline backend: echo the retrieved context so the pipeline can run without an API key."""
+        return prompt.split("Context:", 1)[-1].strip()
+
+    def _encoding(self):
+        if self._tokenizer is None:
+            try:
+                import tiktoken
+            except ImportError as exc:  # pragma: no cover - dependency guard
+                raise ImportError("tiktoken is required for context budgeting. Install with `pip install tiktoken`.") from exc
+            try:
+                self._tokenizer = tiktoken.encoding_for_model(self.model_name)
+            except KeyError:
+                # Non-OpenAI models: o200k_base is a close enough proxy for budgeting.
+                self._tokenizer = tiktoken.get_encoding("o200k_base")
+        return self._tokenizer
+
+    def _build_context(self, reranked: RerankedResult, max_tokens: Optional[int] = None):
+        max_tokens = self.config.max_context_tokens if max_tokens is None else max_tokens
+        # dict keeps the first (highest-ranked) occurrence of each chunk, in rank order
+        unique = {}
         for hit in reranked.items:
-            cid = hit.chunk.id
-            if cid in seen:
-                continue
+            unique.setdefault(hit.chunk.int_id, hit.chunk)
+        if not unique:
+            return "", []
 
-            text = " ".join(hit.chunk.text.split())
-            if total + len(text) > max_chars:
-                break
+        chunks = list(unique.values())
+        uncounted = [c for c in chunks if c.token_count is None]
+        if uncounted:
+            encoded = self._encoding().encode_ordinary_batch([c.normalized_text for c in uncounted])
+            for chunk, tokens in zip(uncounted, encoded):
+                chunk.token_count = len(tokens)
 
-            parts.append(f"[{cid}] {text}")
-            citations.append(cid)
-            seen.add(cid)
-            total += len(text)
+        lengths = np.fromiter((c.token_count for c in chunks), dtype=np.int64, count=len(chunks))
+        cut = int(np.searchsorted(np.cumsum(lengths), max_tokens, side="right"))
+        citations = [c.id for c in chunks[:cut]]
+        parts = [f"[{c.id}] {c.normalized_text}" for c in chunks[:cut]]
 
         return "\n".join(parts), citations
 
+    def _build_prompt(self, context: str, query: str, json_output: bool = True) -> str:
+        if json_output:
+            instructions = (
+                "Answer ONLY using the provided context.\n"
+                'Reply with a JSON object: {"answer": string, "citations": [chunk_id, ...]}.'
+            )
+        else:
+            instructions = "Answer ONLY using the provided context.\nCite sources using [chunk_id]."
+        return f"""
+You are a precise assistant.
+{instructions}
+
+Query:
+{query}
+
+Context:
+{context}
+"""
+
+    @staticmethod
+    def _parse_response(raw: str, citations: List[str]) -> GenerationResult:
+        """Read the structured answer; fall back to plain text with all context citations.
+
+        Never raises: malformed fields are dropped, and cited ids are matched against the context
+        with any surrounding `[...]` the model copied from it stripped.
+        """
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return GenerationResult(answer=raw, citations=citations)
+        if not isinstance(data, dict):
+            return GenerationResult(answer=raw, citations=citations)
+        answer = data.get("answer")
+        cited = data.get("citations")
+        if not isinstance(cited, list):
+            cited = []
+        allowed = set(citations)
+        ids = dict.fromkeys(cid.strip().strip("[]").strip() for cid in cited if isinstance(cid, str))
+        return GenerationResult(
+            answer="" if answer is None else str(answer).strip(),
+            citations=[cid for cid in ids if cid in allowed],
+        )
+
+    @staticmethod
+    def _serialize(result: GenerationResult) -> str:
+        """Cache form of a parsed answer; `_parse_response` reads it back unchanged."""
+        return orjson.dumps({"answer": result.answer, "citations": result.citations}).decode("utf-8")
+
     def generate(self, reranked: RerankedResult, query: str) -> GenerationResult:
         context, citations = self._build_context(reranked)
 
@@ -54,29 +243,78 @@ class Generator:
                 []
             )
 
-        prompt = f"""
-You are a precise assistant.
-Answer ONLY using the provided context.
-Cite sources using [chunk_id].
+        prompt = self._build_prompt(context, query)
+        key = ResponseCache.key(self.model_name, prompt, self.config.temperature)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return self._parse_response(cached, citations)
 
-Query:
-{query}
+        try:
+            raw = self._complete(prompt)
+        except Exception as e:
+            return GenerationResult(answer=f"LLM generation failed; error: {e}", citations=citations)
 
-Context:
-{context}
-"""
+        # Cache the parsed result, not the raw text, so a malformed reply is normalized once.
+        result = self._parse_response(raw, citations)
+        if self.cache:
+            self.cache.put(key, self._serialize(result))
+        return result
+
+    def generate_stream(self, reranked: RerankedResult, query: str) -> Iterator[str]:
+        """Yield answer text as it is decoded instead of waiting for the full response."""
+        context, _ = self._build_context(reranked)
 
+        if not context:
+            yield "No supporting context available to answer the query."
+            return
+
+        # Streamed text is shown as it arrives, so ask for plain prose rather than JSON.
+        prompt = self._build_prompt(context, query, json_output=False)
+        key = ResponseCache.key(self.model_name, prompt, self.config.temperature)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            yield cached
+            return
+
+        pieces: List[str] = []
         try:
-            response = self.client.responses.create(
-                model=self.model_name,
-                input=prompt,
-                temperature=self.config.temperature,
-                max_output_tokens=self.config.max_tokens,
+            for piece in self._stream(prompt):
+                pieces.append(piece)
+                yield piece
+        except Exception as e:
+            yield f"LLM generation failed; error: {e}"
+            return
+
+        if self.cache:
+            self.cache.put(key, "".join(pieces).strip())
+
+    async def agenerate(self, reranked: RerankedResult, query: str) -> GenerationResult:
+        """Async variant of `generate` so several queries can share one event loop."""
+        context, citations = self._build_context(reranked)
+
+        if not context:
+            return GenerationResult(
+                "No supporting context available to answer the query.",
+                []
             )
 
-            answer = response.output_text.strip()
+        prompt = self._build_prompt(context, query)
+        key = ResponseCache.key(self.model_name, prompt, self.config.temperature)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return self._parse_response(cached, citations)
 
+        try:
+            raw = await self._acomplete(prompt)
         except Exception as e:
-            answer = f"LLM generation failed; error: {e}"
+            return GenerationResult(answer=f"LLM generation failed; error: {e}", citations=citations)
+
+        # Cache the parsed result, not the raw text, so a malformed reply is normalized once.
+        result = self._parse_response(raw, citations)
+        if self.cache:
+            self.cache.put(key, self._serialize(result))
+        return result
 
-        return GenerationResult(answer=answer, citations=citations)
+    async def generate_many(self, requests: Sequence[Tuple[RerankedResult, str]]) -> List[GenerationResult]:
+        """Run generation for many (reranked, query) pairs concurrently."""
+        return list(await asyncio.gather(*(self.agenerate(reranked, query) for reranked, query in requests)))
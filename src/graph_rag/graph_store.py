@@ -1,29 +1,96 @@
+import atexit
 import logging
-import re
-from typing import Iterable, List, Tuple
+import threading
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
 
 from .ingestion import Chunk, Entity, Relation
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Cypher cannot parameterize variable-length bounds, so each allowed hop count gets its own
+# literal query string (at most this many cached plans) rather than a deeper filtered search.
+_MAX_HOPS_CAP = 4
+_NEIGHBORS_QUERIES = {
+    hops: (
+        "MATCH (n:Chunk) WHERE n.chunk_id IN $node_ids "
+        "CALL { WITH n "
+        f"MATCH (n)-[:mentions|co_occurs*1..{hops}]-(m:Chunk) "
+        "WHERE m <> n "
+        "RETURN DISTINCT m LIMIT $limit } "
+        "RETURN DISTINCT m.chunk_id AS chunk_id LIMIT $limit"
+    )
+    for hops in range(1, _MAX_HOPS_CAP + 1)
+}
+
+# neo4j.READ_ACCESS; spelled out so the driver import can stay lazy.
+_READ_ACCESS = "READ"
+
+
+def _batched(rows: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
 
 class GraphStore:
     """Neo4j-backed graph store with explicit schema and Neo4j 5+ compatibility.
     
     Schema:
-    - (:Chunk {chunk_id, text, source_document})
+    - (:Chunk {chunk_id, text, source_document, degree})
     - (:Entity {entity_id, name, type})
-    - (Chunk)-[:MENTIONS]->(Entity)
+    - (:Document {document_id})
+    - (Entity)-[:mentions]->(Chunk)
     - (Chunk)-[:part_of]->(Document)
     - (Entity)-[:co_occurs]->(Entity)
     """
 
-    def __init__(self, uri: str, user: str, password: str, database: str = "neo4j") -> None:
+    # (label, key property) of the head and tail node for each relation type.
+    _RELATION_ENDPOINTS = {
+        "part_of": (("Chunk", "chunk_id"), ("Document", "document_id")),
+        "mentions": (("Entity", "entity_id"), ("Chunk", "chunk_id")),
+        "co_occurs": (("Entity", "entity_id"), ("Entity", "entity_id")),
+    }
+    _RELATION_TYPES = frozenset(_RELATION_ENDPOINTS)
+
+    _SCHEMA = (
+        "CREATE CONSTRAINT chunk_id IF NOT EXISTS FOR (c:Chunk) REQUIRE c.chunk_id IS UNIQUE",
+        "CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (e:Entity) REQUIRE e.entity_id IS UNIQUE",
+        "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.document_id IS UNIQUE",
+        "CREATE INDEX chunk_source IF NOT EXISTS FOR (c:Chunk) ON (c.source_document)",
+    )
+
+    # Rows shipped per request; bounds the parameter payload held by the driver and server.
+    batch_size = 50000
+    # Rows per server-side commit inside `CALL { ... } IN TRANSACTIONS`, keeping tx heap and locks small.
+    rows_per_transaction = 10000
+
+    def __init__(
+        self,
+        uri: str,
+        user: str,
+        password: str,
+        database: str = "neo4j",
+        max_connection_pool_size: int = 64,
+        connection_acquisition_timeout: float = 30.0,
+        max_connection_lifetime: float = 3600.0,
+        fetch_size: int = 1000,
+    ) -> None:
         self.uri = uri
         self.user = user
         self.password = password
         self.database = database
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.max_connection_lifetime = max_connection_lifetime
+        self.fetch_size = fetch_size
         self._driver = None
+        # Sessions are not thread-safe, so read sessions are cached one per thread and reused.
+        self._session_local = threading.local()
+        self._read_sessions: List = []
+        self._sessions_lock = threading.Lock()
+        # chunk_id -> degree; degrees only change on upsert, which clears this.
+        self._centrality_cache: Dict[str, float] = {}
 
     def connect(self) -> None:
         if self._driver:
@@ -33,28 +100,93 @@ class GraphStore:
         except ImportError as exc:
             raise ImportError("neo4j Python driver is required. Install with `pip install neo4j`.") from exc
         
-        self._driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        # One pooled driver per store, reused by every session for the life of the process.
+        self._driver = GraphDatabase.driver(
+            self.uri,
+            auth=(self.user, self.password),
+            max_connection_pool_size=self.max_connection_pool_size,
+            connection_acquisition_timeout=self.connection_acquisition_timeout,
+            max_connection_lifetime=self.max_connection_lifetime,
+            fetch_size=self.fetch_size,
+            keep_alive=True,
+        )
+        atexit.register(self.close)
         logger.info(f"Connected to Neo4j at {self.uri}, database: {self.database}")
         self._verify_database()
+        self._ensure_schema()
 
     def close(self) -> None:
+        with self._sessions_lock:
+            for session in self._read_sessions:
+                session.close()
+            self._read_sessions.clear()
+        self._session_local = threading.local()
         if self._driver:
             self._driver.close()
             logger.info("Closed Neo4j connection")
         self._driver = None
 
+    def _read_session(self):
+        """Return this thread's long-lived READ session, opening it on first use."""
+        session = getattr(self._session_local, "session", None)
+        if session is None:
+            session = self._driver.session(database=self.database, default_access_mode=_READ_ACCESS)
+            self._session_local.session = session
+            with self._sessions_lock:
+                self._read_sessions.append(session)
+        return session
+
     def _verify_database(self) -> None:
-        """Verify database exists and log active database."""
+        """Cheap connectivity check on connect; `check_database` does the full SHOW DATABASES probe."""
         try:
-            with self._driver.session(database="neo4j") as session:
+            self._driver.verify_connectivity()
+        except Exception as e:
+            logger.warning(f"Could not verify connectivity: {e}")
+
+    def check_database(self) -> bool:
+        """Debug helper: confirm the configured database exists via the system database."""
+        if not self._driver:
+            self.connect()
+        try:
+            with self._driver.session(database="system") as session:
                 dbs = session.run("SHOW DATABASES").data()
                 db_names = [db["name"] for db in dbs]
                 if self.database in db_names:
                     logger.info(f"Using database '{self.database}'")
-                else:
-                    logger.warning(f"Database '{self.database}' not found. Available: {db_names}")
+                    return True
+                logger.warning(f"Database '{self.database}' not found. Available: {db_names}")
         except Exception as e:
             logger.warning(f"Could not verify database: {e}")
+        return False
+
+    def _ensure_schema(self) -> None:
+        """Create the uniqueness constraints MERGE relies on for index seeks instead of label scans."""
+        try:
+            with self._driver.session(database=self.database) as session:
+                for statement in self._SCHEMA:
+                    session.run(statement).consume()
+        except Exception as e:
+            logger.warning(f"Could not create schema constraints: {e}")
+        self._check_apoc()
+
+    def _check_apoc(self) -> None:
+        """Fail fast if the APOC procedures `_upsert_relations` calls are not installed."""
+        try:
+            with self._driver.session(database=self.database) as session:
+                record = session.run(
+                    "SHOW PROCEDURES YIELD name "
+                    "WHERE name IN ['apoc.merge.node', 'apoc.merge.relationship'] "
+                    "RETURN count(name) AS n"
+                ).single()
+        except Exception as e:
+            logger.warning(f"Could not check for APOC procedures: {e}")
+            return
+        if record is None or record["n"] < 2:
+            raise RuntimeError(
+                "Neo4j APOC plugin is required for relation upserts (apoc.merge.node, "
+                "apoc.merge.relationship). Install APOC Core on the server, e.g. "
+                "NEO4J_PLUGINS='[\"apoc\"]' for the Docker image, and restart Neo4j."
+            )
 
     def verify_connection(self) -> bool:
         """Test connectivity to Neo4j and log status."""
@@ -87,98 +219,156 @@ class GraphStore:
             logger.warning("No data to upsert")
             return
 
+        self._centrality_cache.clear()
+
         with self._driver.session(database=self.database) as session:
-            if chunks_list:
-                session.execute_write(self._upsert_chunks, chunks_list)
-                logger.debug(f"Upserted {len(chunks_list)} chunks")
-            if entities_list:
-                session.execute_write(self._upsert_entities, entities_list)
-                logger.debug(f"Upserted {len(entities_list)} entities")
-            if relations_list:
-                session.execute_write(self._upsert_relations, relations_list)
-                logger.debug(f"Upserted {len(relations_list)} relations")
+            # CALL { ... } IN TRANSACTIONS only runs in auto-commit transactions, hence session.run.
+            for batch in _batched(chunks_list, self.batch_size):
+                self._upsert_chunks(session, batch, self.rows_per_transaction)
+            logger.debug(f"Upserted {len(chunks_list)} chunks")
+            for batch in _batched(entities_list, self.batch_size):
+                self._upsert_entities(session, batch, self.rows_per_transaction)
+            logger.debug(f"Upserted {len(entities_list)} entities")
+            for batch in _batched(relations_list, self.batch_size):
+                self._upsert_relations(session, batch, self.rows_per_transaction)
+            logger.debug(f"Upserted {len(relations_list)} relations")
 
     @staticmethod
-    def _upsert_chunks(tx, chunks: List[Chunk]) -> None:
+    def _upsert_chunks(session, chunks: List[Chunk], rows_per_tx: int) -> None:
         """Insert or update chunks with explicit chunk_id property."""
+        # Columnar parameters: one list per property instead of a dict per row.
         query = (
-            "UNWIND $rows AS row "
-            "MERGE (c:Chunk {chunk_id: row.id}) "
-            "SET c.text = row.text, c.source_document = row.source_document"
+            "UNWIND range(0, size($ids) - 1) AS i "
+            "CALL { WITH i "
+            "MERGE (c:Chunk {chunk_id: $ids[i]}) "
+            "SET c.text = $texts[i], c.source_document = $sources[i] "
+            f"}} IN TRANSACTIONS OF {int(rows_per_tx)} ROWS"
         )
-        tx.run(query, rows=[chunk.__dict__ for chunk in chunks])
+        session.run(
+            query,
+            ids=[c.id for c in chunks],
+            texts=[c.text for c in chunks],
+            sources=[c.source_document for c in chunks],
+        ).consume()
 
     @staticmethod
-    def _upsert_entities(tx, entities: List[Entity]) -> None:
+    def _upsert_entities(session, entities: List[Entity], rows_per_tx: int) -> None:
         """Insert or update entities with explicit entity_id property."""
         query = (
-            "UNWIND $rows AS row "
-            "MERGE (e:Entity {entity_id: row.id}) "
-            "SET e.name = row.label, e.type = row.type"
+            "UNWIND range(0, size($ids) - 1) AS i "
+            "CALL { WITH i "
+            "MERGE (e:Entity {entity_id: $ids[i]}) "
+            "SET e.name = $names[i], e.type = $types[i] "
+            f"}} IN TRANSACTIONS OF {int(rows_per_tx)} ROWS"
         )
-        tx.run(query, rows=[entity.__dict__ for entity in entities])
+        session.run(
+            query,
+            ids=[e.id for e in entities],
+            names=[e.label for e in entities],
+            types=[e.type for e in entities],
+        ).consume()
 
-    @staticmethod
-    def _upsert_relations(tx, relations: List[Relation]) -> None:
-        """Upsert relations, grouping by type for safe Cypher construction."""
-        rels_by_type = {}
-        for rel in relations:
-            rels_by_type.setdefault(rel.type, []).append(rel)
-        
-        for rel_type, rel_list in rels_by_type.items():
-            if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", rel_type):
-                raise ValueError(f"Invalid relation type: {rel_type}")
-
-            rel_query = (
-                "UNWIND $rows AS row "
-                "MERGE (h {id: row.head}) "
-                "MERGE (t {id: row.tail}) "
-                f"MERGE (h)-[r:`{rel_type}`]->(t) "
-                "SET r.score = row.score"
-            )
-            tx.run(rel_query, rows=[rel.__dict__ for rel in rel_list])
+    @classmethod
+    def _upsert_relations(cls, session, relations: List[Relation], rows_per_tx: int) -> None:
+        """Upsert all relations in one statement via APOC, which takes the relationship type as data.
+
+        Endpoint label and key property come from `_RELATION_ENDPOINTS`, so apoc.merge.node still
+        seeks the uniqueness-constraint index. Requires the APOC plugin on the server.
+        """
+        unknown = {rel.type for rel in relations} - cls._RELATION_TYPES
+        if unknown:
+            raise ValueError(f"Unknown relation type(s): {sorted(unknown)}")
+
+        endpoints = [cls._RELATION_ENDPOINTS[rel.type] for rel in relations]
+        query = (
+            "UNWIND range(0, size($heads) - 1) AS i "
+            "CALL { WITH i "
+            "CALL apoc.merge.node([$head_labels[i]], apoc.map.fromValues([$head_keys[i], $heads[i]])) "
+            "YIELD node AS h "
+            "CALL apoc.merge.node([$tail_labels[i]], apoc.map.fromValues([$tail_keys[i], $tails[i]])) "
+            "YIELD node AS t "
+            "CALL apoc.merge.relationship(h, $types[i], {}, {score: $scores[i]}, t, {score: $scores[i]}) "
+            "YIELD rel "
+            "RETURN count(rel) AS merged "
+            f"}} IN TRANSACTIONS OF {int(rows_per_tx)} ROWS "
+            "RETURN sum(merged) AS merged"
+        )
+        session.run(
+            query,
+            heads=[r.head for r in relations],
+            tails=[r.tail for r in relations],
+            types=[r.type for r in relations],
+            scores=[r.score for r in relations],
+            head_labels=[head[0] for head, _ in endpoints],
+            head_keys=[head[1] for head, _ in endpoints],
+            tail_labels=[tail[0] for _, tail in endpoints],
+            tail_keys=[tail[1] for _, tail in endpoints],
+        ).consume()
+
+    def materialize_centrality(self) -> None:
+        """Store each chunk's degree as `n.degree` so reranking reads a property instead of traversing."""
+        if not self._driver:
+            self.connect()
+        if self._driver is None:
+            raise RuntimeError("Failed to initialize Neo4j driver")
+
+        query = (
+            "MATCH (n:Chunk) "
+            "CALL { WITH n SET n.degree = COUNT { (n)--() } } "
+            f"IN TRANSACTIONS OF {int(self.rows_per_transaction)} ROWS"
+        )
+        with self._driver.session(database=self.database) as session:
+            session.run(query).consume()
+        self._centrality_cache.clear()
+        logger.info("Materialized chunk degree centrality")
 
     # --- Read ---
     def neighbors(self, node_ids: List[str], max_hops: int = 2, limit: int = 20) -> List[str]:
         """Find neighboring chunk IDs via graph traversal."""
+        if not 1 <= max_hops <= _MAX_HOPS_CAP:
+            raise ValueError(f"max_hops must be between 1 and {_MAX_HOPS_CAP}, got {max_hops}")
         if not self._driver:
             self.connect()
         if self._driver is None:
             raise RuntimeError("GraphStore driver not initialized")
 
-        with self._driver.session(database=self.database) as session:
-            result = session.execute_read(self._neighbors_query, node_ids, max_hops, limit)
-            return result
+        return self._read_session().execute_read(self._neighbors_query, node_ids, max_hops, limit)
 
     @staticmethod
     def _neighbors_query(tx, node_ids: List[str], max_hops: int, limit: int) -> List[str]:
-        """Find neighbors via variable-length pattern (Neo4j 5+ compatible)."""
-        query = (
-            "MATCH (n:Chunk) WHERE n.chunk_id IN $node_ids "
-            f"MATCH (n)-[*1..{max_hops}]-(m:Chunk) "
-            "RETURN DISTINCT m.chunk_id AS chunk_id LIMIT $limit"
-        )
-        records = tx.run(query, node_ids=node_ids, limit=limit)
+        """Find neighbors via variable-length pattern (Neo4j 5+ compatible).
+
+        Only mentions/co_occurs edges are expanded, so traversal never fans out through part_of to a
+        :Document, and LIMIT is applied per source inside the subquery to stop path enumeration early.
+        The hop bound is a literal in one of a few fixed query strings, so the planner bounds the
+        expansion itself and each hop count reuses its own cached plan.
+        """
+        records = tx.run(_NEIGHBORS_QUERIES[max_hops], node_ids=node_ids, limit=limit)
         return [rec["chunk_id"] for rec in records if rec.get("chunk_id")]
 
     def centrality_score(self, node_ids: List[str]) -> List[Tuple[str, float]]:
-        """Calculate degree centrality for chunks."""
+        """Calculate degree centrality for chunks, querying Neo4j only for ids not cached yet."""
+        cached = [(nid, self._centrality_cache[nid]) for nid in node_ids if nid in self._centrality_cache]
+        misses = [nid for nid in node_ids if nid not in self._centrality_cache]
+        if not misses:
+            return cached
+
         if not self._driver:
             self.connect()
         if self._driver is None:
             raise RuntimeError("GraphStore driver not initialized")
 
-        with self._driver.session(database=self.database) as session:
-            records = session.execute_read(self._degree_query, node_ids)
-            return records
+        records = self._read_session().execute_read(self._degree_query, misses)
+        self._centrality_cache.update(records)
+        return cached + records
 
     @staticmethod
     def _degree_query(tx, node_ids: List[str]) -> List[Tuple[str, float]]:
-        """Calculate node degree (centrality) via Neo4j 5+ COUNT {{ }} syntax."""
+        """Read materialized degree, counting live (Neo4j 5+ COUNT { }) for chunks not materialized yet."""
         query = (
             "MATCH (n:Chunk) "
             "WHERE n.chunk_id IN $node_ids "
-            "RETURN n.chunk_id AS chunk_id, COUNT { (n)--() } AS degree"
+            "RETURN n.chunk_id AS chunk_id, coalesce(n.degree, COUNT { (n)--() }) AS degree"
         )
         records = tx.run(query, node_ids=node_ids)
         results = [(rec["chunk_id"], float(rec["degree"])) for rec in records if rec.get("chunk_id")]
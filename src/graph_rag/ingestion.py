@@ -1,29 +1,44 @@
+import hashlib
+import itertools
 import logging
+import multiprocessing
+import os
 import pathlib
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 from .config import PipelineConfig
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\S+")
 
-@dataclass
+
+@dataclass(slots=True)
 class Chunk:
     id: str
     text: str
     source_document: str
+    int_id: int = -1  # dense int64 key for FAISS labels and hot-path dedup; `id` is kept for display
+    normalized_text: str = field(default="", repr=False)  # whitespace-collapsed text used in prompts
+    token_count: Optional[int] = field(default=None, repr=False)  # filled lazily by the Generator
 
+    def __post_init__(self) -> None:
+        if not self.normalized_text:
+            self.normalized_text = " ".join(self.text.split())
 
-@dataclass
-class Entity:
+
+class Entity(NamedTuple):
     id: str
     label: str
     type: str
 
 
-@dataclass
-class Relation:
+class Relation(NamedTuple):
     head: str
     tail: str
     type: str
@@ -37,7 +52,36 @@ class IngestionResult:
     relations: List[Relation]
 
 
+def _entity_id(label: str, ent_type: str) -> str:
+    # Derived from the canonical key so repeated ingest() calls MERGE onto the same Entity node.
+    digest = hashlib.blake2b(f"{ent_type}\x00{label}".encode("utf-8"), digest_size=8).hexdigest()
+    return f"ent_{digest}"
+
+
+def _path_digest(path: str) -> str:
+    # Chunk and document ids derive from the resolved path, so rebuilding the same files
+    # yields the same ids (MERGE / index dedup) while distinct files never collide.
+    return hashlib.blake2b(str(pathlib.Path(path).resolve()).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _read_text(path: str) -> str:
+    return pathlib.Path(path).read_text(encoding="utf-8")
+
+
+def _read_pdf(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as exc:  # pragma: no cover - dependency guard
+        raise ImportError("pypdf is required to read PDFs. Install with `pip install pypdf`.") from exc
+
+    reader = PdfReader(path, strict=False)
+    pages = [p.extract_text() or "" for p in reader.pages]
+    return "\n".join(pages)
+
+
 class IngestionPipeline:
+    _NER_BATCH = 64
+
     def __init__(self, config: PipelineConfig) -> None:
         self.config = config
         try:
@@ -45,24 +89,36 @@ class IngestionPipeline:
         except ImportError as exc:  # pragma: no cover - dependency guard
             raise ImportError("spaCy is required for NER. Install with `pip install spacy` and download a model.") from exc
 
+        spacy.prefer_gpu()
+
         try:
-            self._nlp = spacy.load("en_core_web_sm")
+            # Only `doc.ents` is used, so skip the tagger/parser/lemmatizer stages.
+            self._nlp = spacy.load(
+                "en_core_web_sm", disable=["tagger", "parser", "lemmatizer", "attribute_ruler"]
+            )
         except OSError as exc:  # pragma: no cover - model guard
             raise RuntimeError(
                 "spaCy model 'en_core_web_sm' is not installed. Run `python -m spacy download en_core_web_sm`."
             ) from exc
 
+        # Monotonic across ingest() calls so int ids stay unique within one index.
+        self._next_int_id = 0
+
+    def reserve_int_ids(self, start: int) -> None:
+        """Never hand out int ids below `start`, e.g. those of an index loaded from disk."""
+        self._next_int_id = max(self._next_int_id, start)
+
     def ingest(self, paths: Iterable[str]) -> IngestionResult:
         documents = self._load_documents(paths)
         logger.info(f"Loaded {len(documents)} documents")
         
-        chunks = self._chunk_documents(documents)
+        # Chunks are generated lazily and pulled through NER as spaCy consumes them.
+        chunks, entities, chunk_entities = self._extract_entities(self._chunk_documents(documents))
         logger.info(f"Created {len(chunks)} chunks")
         
         if not chunks:
             raise ValueError("No chunks created from input documents")
         
-        entities, chunk_entities = self._extract_entities(chunks)
         logger.info(f"Extracted {len(entities)} unique entities")
         
         relations = self._extract_relations(chunks, entities, chunk_entities)
@@ -70,56 +126,122 @@ class IngestionPipeline:
         
         return IngestionResult(chunks=chunks, entities=entities, relations=relations)
 
-    def _load_documents(self, paths: Iterable[str]) -> List[str]:
-        docs = []
-        for path in paths:
-            suffix = pathlib.Path(path).suffix.lower()
-            if suffix not in self.config.allowed_formats:
-                continue
-            if suffix == ".pdf":
-                docs.append(self._read_pdf(path))
+    def iter_chunk_batches(self, paths: Iterable[str], batch_size: int) -> Iterator[List[Chunk]]:
+        """Load documents and yield their chunks in lists of at most `batch_size`."""
+        documents = self._load_documents(paths)
+        logger.info(f"Loaded {len(documents)} documents")
+
+        batch: List[Chunk] = []
+        for chunk in self._chunk_documents(documents):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def process_batch(self, chunks: List[Chunk]) -> IngestionResult:
+        """Run NER and relation extraction over one batch of chunks.
+
+        With `ner_processes > 1`, spaCy starts its worker processes afresh for every call.
+        """
+        chunks, entities, chunk_entities = self._extract_entities(chunks)
+        relations = self._extract_relations(chunks, entities, chunk_entities)
+        return IngestionResult(chunks=chunks, entities=entities, relations=relations)
+
+    def _load_documents(self, paths: Iterable[str]) -> List[Tuple[str, str]]:
+        """Read every supported file, returning (path, text) pairs in input order."""
+        paths = [p for p in paths if pathlib.Path(p).suffix.lower() in self.config.allowed_formats]
+        docs: List[str] = [""] * len(paths)
+        pdf_idx = [i for i, p in enumerate(paths) if pathlib.Path(p).suffix.lower() == ".pdf"]
+        text_idx = [i for i, p in enumerate(paths) if pathlib.Path(p).suffix.lower() != ".pdf"]
+
+        # Plain-text reads are I/O-bound and release the GIL, so threads overlap the disk latency.
+        if len(text_idx) > 1:
+            with ThreadPoolExecutor(max_workers=min(32, len(text_idx))) as pool:
+                for i, text in zip(text_idx, pool.map(_read_text, [paths[i] for i in text_idx])):
+                    docs[i] = text
+        else:
+            for i in text_idx:
+                docs[i] = _read_text(paths[i])
+
+        # PDF parsing is mostly pure Python, so processes scale best; threads avoid spawn and
+        # pickling cost when there are many small PDFs.
+        if len(pdf_idx) > 1:
+            cpus = os.cpu_count() or 1
+            if self.config.pdf_executor == "thread":
+                workers = self.config.ingest_workers or min(32, cpus * 4)
+                executor = ThreadPoolExecutor(max_workers=min(len(pdf_idx), workers))
             else:
-                docs.append(pathlib.Path(path).read_text(encoding="utf-8"))
-        return docs
+                workers = self.config.ingest_workers or cpus
+                # Spawn, not fork: by now torch, faiss and the Neo4j driver have threads running,
+                # and a forked child can inherit one of their locks held and deadlock.
+                executor = ProcessPoolExecutor(
+                    max_workers=min(len(pdf_idx), workers), mp_context=multiprocessing.get_context("spawn")
+                )
+            with executor as pool:
+                for i, text in zip(pdf_idx, pool.map(_read_pdf, [paths[i] for i in pdf_idx])):
+                    docs[i] = text
+        else:
+            for i in pdf_idx:
+                docs[i] = _read_pdf(paths[i])
+        return list(zip(paths, docs))
 
-    def _read_pdf(self, path: str) -> str:
-        try:
-            from pypdf import PdfReader
-        except ImportError as exc:  # pragma: no cover - dependency guard
-            raise ImportError("pypdf is required to read PDFs. Install with `pip install pypdf`.") from exc
+    def _chunk_documents(self, documents: List[Tuple[str, str]]) -> Iterator[Chunk]:
+        step = self.config.chunk_size - self.config.chunk_overlap
+        for path, doc in documents:
+            digest = _path_digest(path)
+            # Word boundaries once per document; each window is a single slice of the original text.
+            starts, ends = [], []
+            for m in _WORD_RE.finditer(doc):
+                starts.append(m.start())
+                ends.append(m.end())
+            n_words = len(starts)
+            for start in range(0, n_words, step):
+                last = min(start + self.config.chunk_size, n_words) - 1
+                yield Chunk(
+                    id=f"chunk_{digest}_{start}",
+                    text=doc[starts[start] : ends[last]],
+                    source_document=f"doc_{digest}",
+                    int_id=self._next_int_id,
+                )
+                self._next_int_id += 1
 
-        reader = PdfReader(path)
-        pages = [p.extract_text() or "" for p in reader.pages]
-        return "\n".join(pages)
+    def _extract_entities(
+        self, chunk_iter: Iterable[Chunk]
+    ) -> Tuple[List[Chunk], List[Entity], Dict[str, List[str]]]:
+        """One Entity per (lowercased surface form, NER type); chunks reference them by id.
 
-    def _chunk_documents(self, documents: List[str]) -> List[Chunk]:
+        `chunk_iter` is consumed lazily; tee buffers only the chunks spaCy has read ahead.
+        """
         chunks: List[Chunk] = []
-        for idx, doc in enumerate(documents):
-            words = doc.split()
-            step = self.config.chunk_size - self.config.chunk_overlap
-            for start in range(0, len(words), step):
-                piece = words[start : start + self.config.chunk_size]
-                chunk_id = f"chunk_{idx}_{start}"
-                chunks.append(Chunk(id=chunk_id, text=" ".join(piece), source_document=f"doc_{idx}"))
-        return chunks
-
-    def _extract_entities(self, chunks: List[Chunk]) -> Tuple[List[Entity], Dict[str, List[str]]]:
         entities: List[Entity] = []
+        entity_index: Dict[Tuple[str, str], str] = {}
         chunk_entities: Dict[str, List[str]] = {}
-        for chunk in chunks:
-            doc = self._nlp(chunk.text)
-            chunk_entities[chunk.id] = []
-            for i, ent in enumerate(doc.ents):
-                ent_id = f"ent_{chunk.id}_{i}"
-                entities.append(Entity(id=ent_id, label=ent.text, type=ent.label_))
-                chunk_entities[chunk.id].append(ent_id)
-        return entities, chunk_entities
+        for_ner, for_zip = itertools.tee(chunk_iter)
+        docs = self._nlp.pipe(
+            (c.text for c in for_ner), batch_size=self._NER_BATCH, n_process=self.config.ner_processes
+        )
+        for chunk, doc in zip(for_zip, docs):
+            chunks.append(chunk)
+            mentioned: Dict[str, None] = {}
+            for ent in doc.ents:
+                key = (ent.text.lower(), ent.label_)
+                ent_id = entity_index.get(key)
+                if ent_id is None:
+                    ent_id = _entity_id(*key)
+                    entity_index[key] = ent_id
+                    entities.append(Entity(id=ent_id, label=ent.text, type=ent.label_))
+                mentioned[ent_id] = None
+            chunk_entities[chunk.id] = list(mentioned)
+        return chunks, entities, chunk_entities
 
     def _extract_relations(
         self, chunks: List[Chunk], entities: List[Entity], chunk_entities: Dict[str, List[str]]
     ) -> List[Relation]:
         relations: List[Relation] = []
         entity_lookup = {e.id: e for e in entities}
+        seen_pairs = set()
 
         for chunk in chunks:
             relations.append(Relation(head=chunk.id, tail=chunk.source_document, type="part_of", score=1.0))
@@ -129,14 +251,23 @@ class IngestionPipeline:
                 relations.append(Relation(head=ent_id, tail=chunk.id, type="mentions", score=1.0))
 
             if len(ent_ids) > 1:
-                for a_idx in range(len(ent_ids)):
-                    for b_idx in range(a_idx + 1, len(ent_ids)):
-                        a = ent_ids[a_idx]
-                        b = ent_ids[b_idx]
-                        head_label = entity_lookup[a].label.lower()
-                        tail_label = entity_lookup[b].label.lower()
-                        score = 1.0 if head_label != tail_label else 0.5
-                        relations.append(Relation(head=a, tail=b, type="co_occurs", score=score))
-                        relations.append(Relation(head=b, tail=a, type="co_occurs", score=score))
+                # One edge per pair: traversal treats co_occurs as undirected.
+                # Dense per-chunk label codes, so pair scores are one vectorized comparison.
+                codes: Dict[str, int] = {}
+                label_codes = np.fromiter(
+                    (codes.setdefault(entity_lookup[e].label.lower(), len(codes)) for e in ent_ids),
+                    dtype=np.int64,
+                    count=len(ent_ids),
+                )
+                rows, cols = np.triu_indices(len(ent_ids), k=1)
+                scores = np.where(label_codes[rows] != label_codes[cols], 1.0, 0.5)
+                for i, j, score in zip(rows.tolist(), cols.tolist(), scores.tolist()):
+                    a, b = ent_ids[i], ent_ids[j]
+                    pair = (a, b) if a < b else (b, a)
+                    if pair in seen_pairs:
+                        continue
+                    seen_pairs.add(pair)
+                    # Canonical direction, so MERGE dedups the edge across batches too.
+                    relations.append(Relation(head=pair[0], tail=pair[1], type="co_occurs", score=score))
 
         return relations
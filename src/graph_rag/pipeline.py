@@ -1,6 +1,10 @@
+import asyncio
+import functools
 import os
 import logging
-from typing import List
+import queue
+import threading
+from typing import Iterator, List, Sequence, Tuple
 
 from .config import PipelineConfig
 from .embeddings import TextEmbedder
@@ -12,13 +16,21 @@ from .retrieval import Retriever
 
 logger = logging.getLogger(__name__)
 
+_DONE = object()
+
 
 class GraphRAGPipeline:
+    # Chunks per ingestion batch and batches buffered between stages (backpressure bound).
+    _INGEST_BATCH = 1000
+    _QUEUE_DEPTH = 4
+
     def __init__(self, config: PipelineConfig) -> None:
         self.config = config
 
         # --- Ingestion ---
         self.ingestion = IngestionPipeline(config)
+        # Per-instance memo of query NER; spaCy's Language is unhashable, so key on text only.
+        self._query_entities = functools.lru_cache(maxsize=1024)(self._ner_query_entities)
 
         # --- GraphStore (env-based, passed explicitly) ---
         neo4j_uri = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
@@ -40,32 +52,100 @@ class GraphRAGPipeline:
         self.embedder = TextEmbedder(
             model_name=config.embedding.model_name,
             device=config.embedding.device,
+            quantize=config.embedding.quantize,
         )
         self.retriever = Retriever(config.retrieval, self.embedder, self.graph_store)
+        index_path = config.retrieval.index_path
+        if index_path and os.path.exists(os.path.join(index_path, "chunks.pkl")):
+            self.retriever.load(index_path)
+            logger.info(f"Loaded retrieval index from {index_path}")
 
         # --- Reranking & Generation ---
-        self.reranker = Reranker(self.graph_store)
-        self.generator = Generator(config.generation)
+        self.reranker = Reranker(self.graph_store, top_k=config.generation.top_k)
+        self.generator = Generator(config.generation, cache_dir=config.cache_dir)
 
     def build_indexes(self, paths: List[str]) -> None:
-        """Load documents, extract entities/relations, upsert to graph and index for retrieval."""
+        """Load documents, extract entities/relations, upsert to graph and index for retrieval.
+
+        Chunking, NER and Neo4j upserts run as a three-stage pipeline over bounded queues, so
+        graph writes for one batch overlap NER on the next. FAISS indexing runs once at the end
+        so the index type is chosen from the full corpus size.
+        """
         logger.info(f"Building indexes from {len(paths)} paths")
-        
-        result = self.ingestion.ingest(paths)
-        logger.info(f"Ingestion complete: {len(result.chunks)} chunks, {len(result.entities)} entities, {len(result.relations)} relations")
-        
-        if not result.chunks:
+        # Chunk ids are stable per file, but int ids come from a counter that restarts per process;
+        # start it past a loaded index so new chunks never reuse one.
+        self.ingestion.reserve_int_ids(self.retriever.next_int_id())
+
+        chunk_q: "queue.Queue" = queue.Queue(maxsize=self._QUEUE_DEPTH)
+        result_q: "queue.Queue" = queue.Queue(maxsize=self._QUEUE_DEPTH)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        def chunk_stage() -> None:
+            try:
+                for batch in self.ingestion.iter_chunk_batches(paths, self._INGEST_BATCH):
+                    if stop.is_set():
+                        break
+                    chunk_q.put(batch)
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+            finally:
+                chunk_q.put(_DONE)
+
+        def extract_stage() -> None:
+            try:
+                while (batch := chunk_q.get()) is not _DONE:
+                    if not stop.is_set():  # after a failure, keep draining so the producer can exit
+                        result_q.put(self.ingestion.process_batch(batch))
+            except BaseException as exc:
+                errors.append(exc)
+                stop.set()
+                while chunk_q.get() is not _DONE:
+                    pass
+            finally:
+                result_q.put(_DONE)
+
+        workers = [
+            threading.Thread(target=chunk_stage, name="ingest-chunk", daemon=True),
+            threading.Thread(target=extract_stage, name="ingest-ner", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        chunks = []
+        n_entities = n_relations = 0
+        try:
+            while (result := result_q.get()) is not _DONE:
+                if stop.is_set():
+                    continue
+                self.graph_store.upsert(result.chunks, result.entities, result.relations)
+                self.retriever.index_mentions(result.entities, result.relations)
+                chunks.extend(result.chunks)
+                n_entities += len(result.entities)
+                n_relations += len(result.relations)
+        except BaseException:
+            stop.set()
+            while result_q.get() is not _DONE:
+                pass
+            raise
+        finally:
+            for worker in workers:
+                worker.join()
+        if errors:
+            raise errors[0]
+
+        logger.info(f"Ingestion complete: {len(chunks)} chunks, {n_entities} entities, {n_relations} relations")
+        if not chunks:
             raise ValueError("Ingestion produced no chunks; check input documents")
-        
-        self.graph_store.upsert(
-            result.chunks,
-            result.entities,
-            result.relations,
-        )
         logger.info("Upserted data to Neo4j")
-        
-        self.retriever.index(result.chunks)
-        logger.info(f"Indexed {len(result.chunks)} chunks in FAISS")
+        self.graph_store.materialize_centrality()
+
+        self.retriever.index(chunks)
+        self.retriever.flush()
+        logger.info(f"Indexed {len(chunks)} chunks in FAISS")
+        if self.config.retrieval.index_path:
+            self.retriever.save(self.config.retrieval.index_path)
 
     def answer(self, query: str) -> str:
         entry_entities = self._extract_query_entities(query)
@@ -74,7 +154,33 @@ class GraphRAGPipeline:
         generation = self.generator.generate(reranked, query)
         return generation.answer
 
+    def answer_stream(self, query: str) -> Iterator[str]:
+        """Like `answer`, but yields the answer text incrementally as the LLM decodes it."""
+        entry_entities = self._extract_query_entities(query)
+        retrieved = self.retriever.retrieve(query, entry_entities)
+        reranked = self.reranker.rerank(retrieved)
+        yield from self.generator.generate_stream(reranked, query)
+
+    async def aanswer(self, query: str) -> str:
+        """Async variant of `answer`; NER, retrieval and reranking run on worker threads, the LLM call is awaited."""
+        entry_entities = await asyncio.to_thread(self._extract_query_entities, query)
+        retrieved = await self.retriever.aretrieve(query, entry_entities)
+        reranked = await asyncio.to_thread(self.reranker.rerank, retrieved)
+        generation = await self.generator.agenerate(reranked, query)
+        return generation.answer
+
+    async def answer_many(self, queries: Sequence[str]) -> List[str]:
+        """Answer several queries: one batched retrieval, then overlapping LLM round-trips."""
+        entities = [self._extract_query_entities(q) for q in queries]
+        retrieved = self.retriever.retrieve_batch(queries, entities)
+        reranked = [self.reranker.rerank(r) for r in retrieved]
+        generations = await self.generator.generate_many(list(zip(reranked, queries)))
+        return [g.answer for g in generations]
+
     def _extract_query_entities(self, query: str) -> List[str]:
-        """Extract entity surface forms from the query using spaCy."""
+        """Extract entity surface forms from the query using spaCy (cached per query string)."""
+        return list(self._query_entities(query))
+
+    def _ner_query_entities(self, query: str) -> Tuple[str, ...]:
         doc = self.ingestion._nlp(query)
-        return list({ent.text for ent in doc.ents})
+        return tuple({ent.text for ent in doc.ents})
@@ -1,6 +1,8 @@
 import logging
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
+
+import numpy as np
 
 from .graph_store import GraphStore
 from .retrieval import RetrievalResult, RetrievedChunk
@@ -8,17 +10,23 @@ from .retrieval import RetrievalResult, RetrievedChunk
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class RerankedResult:
     items: List[RetrievedChunk]
 
 
 class Reranker:
-    def __init__(self, graph_store: GraphStore) -> None:
+    def __init__(self, graph_store: GraphStore, top_k: int = 10) -> None:
         self.graph_store = graph_store
+        self.top_k = top_k
+
+    def rerank(self, result: RetrievalResult, top_k: Optional[int] = None) -> RerankedResult:
+        """Blend semantic score with graph centrality prior, with fallback to semantic if no graph data.
 
-    def rerank(self, result: RetrievalResult) -> RerankedResult:
-        """Blend semantic score with graph centrality prior, with fallback to semantic if no graph data."""
+        Scores are blended as arrays and only the best `top_k` hits are selected (argpartition,
+        then a sort of those k) and materialized.
+        """
+        top_k = self.top_k if top_k is None else top_k
         ids = [hit.chunk.id for hit in result.merged]
         
         if not ids:
@@ -29,14 +37,18 @@ class Reranker:
         
         if not centrality:
             logger.warning("No centrality scores from graph; returning semantic ranking")
-            return RerankedResult(items=result.merged)
+            return RerankedResult(items=result.merged[:top_k])
         
-        rescored: List[RetrievedChunk] = []
-        for hit in result.merged:
-            c_score = centrality.get(hit.chunk.id, 0.0)
-            final_score = 0.7 * hit.score + 0.3 * c_score
-            rescored.append(RetrievedChunk(chunk=hit.chunk, score=final_score))
-        
-        rescored.sort(key=lambda x: x.score, reverse=True)
-        logger.debug(f"Reranked {len(rescored)} chunks using centrality")
-        return RerankedResult(items=rescored)
+        n = len(result.merged)
+        semantic = np.fromiter((hit.score for hit in result.merged), dtype=np.float32, count=n)
+        graph = np.fromiter((centrality.get(nid, 0.0) for nid in ids), dtype=np.float32, count=n)
+        final = 0.7 * semantic + 0.3 * graph
+
+        k = max(0, min(top_k, n))
+        # argpartition leaves the kept indices unordered; sort them so ties follow merged order.
+        top = np.sort(np.argpartition(-final, k - 1)[:k]) if 0 < k < n else np.arange(k)
+        top = top[np.argsort(-final[top], kind="stable")]
+        merged = result.merged
+        items = [RetrievedChunk(merged[i].chunk, score) for i, score in zip(top.tolist(), final[top].tolist())]
+        logger.debug(f"Reranked {len(result.merged)} chunks using centrality, kept {len(items)}")
+        return RerankedResult(items=items)
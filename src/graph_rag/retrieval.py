@@ -1,21 +1,70 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
 from .config import RetrievalConfig
 from .embeddings import TextEmbedder
 from .graph_store import GraphStore
-from .ingestion import Chunk
+from .ingestion import Chunk, Entity, Relation
 
+__all__ = ["Retriever", "RetrievedChunk", "RetrievalResult"]
 
-@dataclass
+
+def _aligned_empty(shape: Tuple[int, int], dtype=np.float32, alignment: int = 64) -> np.ndarray:
+    """Uninitialized C-contiguous array whose data starts on an `alignment`-byte boundary."""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = np.empty(nbytes + alignment, dtype=np.uint8)
+    offset = -buf.ctypes.data % alignment
+    return buf[offset : offset + nbytes].view(dtype).reshape(shape)
+
+
+def _write_atomically(target: str, write) -> None:
+    """Call `write(tmp_path)` on a temp file beside `target`, then atomically move it into place."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    with open(path, "wb") as f:  # file object, so np.save does not append ".npy" to the temp name
+        np.save(f, array)
+
+
+def _save_pickle(path: str, obj) -> None:
+    with open(path, "wb") as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _import_faiss():
+    try:
+        import faiss  # type: ignore
+    except ImportError as exc:  # pragma: no cover - dependency guard
+        raise ImportError("faiss is required for retrieval. Install with `pip install faiss-cpu`." ) from exc
+    return faiss
+
+
+@dataclass(slots=True)
 class RetrievedChunk:
     chunk: Chunk
-    score: float
+    score: float  # semantic hits: cosine similarity in [-1, 1]
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResult:
     semantic: List[RetrievedChunk]
     graph: List[RetrievedChunk]
@@ -23,25 +72,92 @@ class RetrievalResult:
 
 
 class Retriever:
-    def __init__(self, config: RetrievalConfig, embedder: TextEmbedder, graph_store: GraphStore) -> None:
+    # Below this many rows per shard, thread dispatch costs more than the parallel scan saves.
+    _MIN_SHARD_ROWS = 50_000
+    _GPU_TEMP_MEMORY = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        config: RetrievalConfig,
+        embedder: TextEmbedder,
+        graph_store: GraphStore,
+    ) -> None:
         self.config = config
         self.embedder = embedder
         self.graph_store = graph_store
         self._id_to_chunk: Dict[str, Chunk] = {}
-        self._chunk_ids: List[str] = []
+        self._int_to_chunk: Dict[int, Chunk] = {}
+        # Indexed chunks in insertion order; row i of _vectors is _chunks[i]. ANN indexes are wrapped
+        # in IndexIDMap2 keyed by Chunk.int_id instead, resolved through _int_to_chunk.
+        self._chunks: List[Chunk] = []
+        # lowercased entity surface form -> ids of chunks mentioning it (graph expansion seeds);
+        # an insertion-ordered dict per entity so re-ingesting a chunk does not repeat it
+        self._entity_chunks: Dict[str, Dict[str, None]] = {}
         self._faiss_index = None
+        # Exact search runs faiss.knn over this owned matrix instead of an IndexFlatIP copy.
+        # The scanned matrix lives in its own aligned array, apart from the Chunk objects.
+        self._vectors: Optional[np.ndarray] = None
+        self._n_vectors = 0
+        self._gpu_resources = None
+        self._gpu_flat = None  # GPU-resident copy of the owned matrix, rows in the same order
         self._dim = None
+        self._index_file: Optional[str] = None  # set while the ANN index is a read-only mmap
+        # (model_name, query) -> embedding row, most recently used last
+        self._query_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        # Graph expansion waits on Neo4j while FAISS releases the GIL, so the two overlap well.
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="graph-expand")
+        self._shard_pool: Optional[ThreadPoolExecutor] = None
+        # Chunks accepted by index() but not yet encoded and added to FAISS.
+        self._pending_chunks: List[Chunk] = []
+        self._flush_lock = threading.Lock()
 
     def index(self, chunks: Sequence[Chunk]) -> None:
+        """Queue chunks for indexing; they are encoded and added once `add_batch_size` accumulate.
+
+        Call `flush()` to index the remainder; searches flush automatically.
+        """
         if not chunks:
             return
 
-        # Skip chunks already indexed to avoid duplicate IDs and stale mappings.
+        # Skip chunks already indexed (or queued) to avoid duplicate IDs and stale mappings.
         new_chunks = [c for c in chunks if c.id not in self._id_to_chunk]
         if not new_chunks:
             return
+        if any(c.int_id < 0 for c in new_chunks):
+            raise ValueError("Chunks must carry a non-negative int_id before indexing.")
+
+        self._id_to_chunk.update((c.id, c) for c in new_chunks)
+        self._int_to_chunk.update((c.int_id, c) for c in new_chunks)
+        self._pending_chunks.extend(new_chunks)
+        if len(self._pending_chunks) >= self.config.add_batch_size:
+            self.flush()
+
+    def next_int_id(self) -> int:
+        """Smallest int id not used by any indexed or queued chunk."""
+        return max(self._int_to_chunk, default=-1) + 1
+
+    def index_mentions(self, entities: Sequence[Entity], relations: Sequence[Relation]) -> None:
+        """Record which chunks mention each entity, from the `mentions` relations of one batch."""
+        labels = {e.id: e.label.lower() for e in entities}
+        for rel in relations:
+            if rel.type == "mentions" and rel.head in labels:
+                self._entity_chunks.setdefault(labels[rel.head], {})[rel.tail] = None
+
+    def flush(self) -> None:
+        """Encode all queued chunks in one pass and add them to the index with a single call."""
+        with self._flush_lock:
+            if not self._pending_chunks:
+                return
+            new_chunks, self._pending_chunks = self._pending_chunks, []
+            try:
+                self._add(new_chunks)
+            except Exception:
+                self._pending_chunks[:0] = new_chunks
+                raise
 
-        vectors = np.asarray(self.embedder.encode([c.text for c in new_chunks]), dtype=np.float32)
+    def _add(self, new_chunks: List[Chunk]) -> None:
+        vectors = self.embedder.encode([c.text for c in new_chunks])
         if vectors.ndim != 2:
             raise ValueError("Embedder returned invalid shape for vectors.")
         dim = vectors.shape[1]
@@ -50,65 +166,371 @@ class Retriever:
         elif dim != self._dim:
             raise ValueError("Embedding dimension mismatch across indexed chunks.")
 
-        try:
-            import faiss  # type: ignore
-        except ImportError as exc:  # pragma: no cover - dependency guard
-            raise ImportError("faiss is required for retrieval. Install with `pip install faiss-cpu`." ) from exc
+        faiss = _import_faiss()
+
+        if self._faiss_index is None and self._vectors is None and self._index_type(len(vectors)) == "flat":
+            self._vectors = _aligned_empty((max(self.config.expected_chunks, 0), dim))
+
+        if self._vectors is not None:
+            self._append_vectors(vectors)
+        else:
+            if not self.embedder.normalize:
+                faiss.normalize_L2(vectors)  # in place; inner product is cosine only on unit vectors
+            if self._faiss_index is None:
+                # IDMap2 returns the chunks' int64 ids from search directly.
+                self._faiss_index = faiss.IndexIDMap2(self._to_device(faiss, self._build_index(faiss, vectors)))
+            elif self._index_file is not None:
+                # A memory-mapped index is read-only; load a writable copy before growing it.
+                self._faiss_index = faiss.read_index(self._index_file)
+                self._index_file = None
+            int_ids = np.fromiter((c.int_id for c in new_chunks), dtype=np.int64, count=len(new_chunks))
+            self._faiss_index.add_with_ids(vectors, int_ids)
+
+        self._chunks.extend(new_chunks)
+
+    def save(self, path: str) -> None:
+        """Write the index and chunk metadata under `path` so `load` can skip re-ingestion.
+
+        Each file is written to a temporary name and swapped in with `os.replace`, so files this
+        Retriever (or another process) still has memory-mapped are never truncated in place.
+        """
+        self.flush()
+        os.makedirs(path, exist_ok=True)
+        vectors_file = os.path.join(path, "vectors.npy")
+        index_file = os.path.join(path, "index.faiss")
+        if self._vectors is not None:
+            vectors = self._vectors[: self._n_vectors]
+            _write_atomically(vectors_file, lambda tmp: _save_npy(tmp, vectors))
+            stale = index_file
+        else:
+            faiss = _import_faiss()
+            index = self._faiss_index
+            if self._gpu_resources is not None:
+                index = faiss.index_gpu_to_cpu(index)
+            _write_atomically(index_file, lambda tmp: faiss.write_index(index, tmp))
+            stale = vectors_file
+        # `load` picks the index kind by which file exists, so drop one left by an earlier save.
+        if os.path.exists(stale):
+            os.remove(stale)
+        meta = {"model_name": self.embedder.model_name, "chunks": self._chunks, "entity_chunks": self._entity_chunks}
+        _write_atomically(os.path.join(path, "chunks.pkl"), lambda tmp: _save_pickle(tmp, meta))
+
+    def load(self, path: str) -> None:
+        """Restore an index written by `save`, memory-mapping the vectors instead of reading them into RAM."""
+        with open(os.path.join(path, "chunks.pkl"), "rb") as f:
+            meta = pickle.load(f)
+        if meta["model_name"] != self.embedder.model_name:
+            raise ValueError(
+                f"Index at {path} was built with {meta['model_name']}, not {self.embedder.model_name}"
+            )
+
+        # Any GPU mirror holds rows of the previous matrix; it is rebuilt lazily on the next search.
+        self._gpu_flat = None
+        vectors_file = os.path.join(path, "vectors.npy")
+        if os.path.exists(vectors_file):
+            # Page cache backs the matrix; the first append copies it into a growable buffer.
+            self._vectors = np.load(vectors_file, mmap_mode="r")
+            self._n_vectors = len(self._vectors)
+            self._faiss_index = None
+            self._index_file = None
+        else:
+            faiss = _import_faiss()
+            index_file = os.path.join(path, "index.faiss")
+            self._faiss_index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            self._index_file = index_file
+            self._vectors = None
+            self._n_vectors = 0
+        self._dim = self._vectors.shape[1] if self._vectors is not None else self._faiss_index.d
 
-        if self._faiss_index is None:
-            self._faiss_index = faiss.IndexFlatIP(self._dim)
-        self._faiss_index.add(vectors)
+        chunks: List[Chunk] = meta["chunks"]
+        self._chunks = list(chunks)
+        self._id_to_chunk = {c.id: c for c in chunks}
+        self._int_to_chunk = {c.int_id: c for c in chunks}
+        self._entity_chunks = {label: dict.fromkeys(ids) for label, ids in meta.get("entity_chunks", {}).items()}
+        self._pending_chunks = []
+        self._query_cache.clear()
 
-        for chunk in new_chunks:
-            self._id_to_chunk[chunk.id] = chunk
-            self._chunk_ids.append(chunk.id)
+    def _append_vectors(self, vectors: np.ndarray) -> None:
+        """Copy a batch into the owned matrix, doubling its capacity when full.
+
+        If the embedder does not normalize, rows are scaled to unit length so the inner-product
+        scan ranks by cosine similarity.
+        """
+        end = self._n_vectors + len(vectors)
+        if end > len(self._vectors):
+            capacity = max(end, 2 * len(self._vectors))
+            grown = _aligned_empty((capacity, self._dim))
+            grown[: self._n_vectors] = self._vectors[: self._n_vectors]
+            self._vectors = grown
+        block = self._vectors[self._n_vectors : end]
+        block[:] = vectors
+        if not self.embedder.normalize:
+            _import_faiss().normalize_L2(block)
+        if self._gpu_flat is not None:
+            self._gpu_flat.add(block)
+        self._n_vectors = end
+
+    def _index_type(self, n: int) -> str:
+        if self.config.index_type == "auto":
+            return "flat" if n < self.config.ann_min_vectors else "hnsw"
+        return self.config.index_type
+
+    def _build_index(self, faiss, vectors: np.ndarray):
+        """Create the ANN index named by `config.index_type`, sized from the first batch.
+
+        Vectors arrive L2-normalized, so inner product is cosine similarity for every index type.
+        """
+        n = vectors.shape[0]
+        index_type = self._index_type(n)
+
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self._dim, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.config.ef_construction
+            index.hnsw.efSearch = self.config.ef_search
+            return index
+
+        if index_type in ("sq", "hnsw_sq"):
+            qtype = {"8bit": faiss.ScalarQuantizer.QT_8bit, "fp16": faiss.ScalarQuantizer.QT_fp16}[self.config.sq_type]
+            if index_type == "sq":
+                index = faiss.IndexScalarQuantizer(self._dim, qtype, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexHNSWSQ(self._dim, qtype, self.config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                index.hnsw.efConstruction = self.config.ef_construction
+                index.hnsw.efSearch = self.config.ef_search
+            # Training only learns per-dimension value ranges, so a modest sample is enough.
+            sample = vectors[np.random.default_rng(0).choice(n, min(n, 100_000), replace=False)]
+            index.train(np.ascontiguousarray(sample, dtype=np.float32))
+            return index
+
+        if index_type in ("ivf", "ivfpq"):
+            # ~39 training points per list is the least FAISS accepts without warning
+            nlist = max(1, min(max(100, int(4 * np.sqrt(n))), n // 39))
+            quantizer = faiss.IndexFlatIP(self._dim)
+            if index_type == "ivf":
+                index = faiss.IndexIVFFlat(quantizer, self._dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                m = self.config.pq_m or self._dim // 8
+                if self._dim % m:
+                    raise ValueError(f"pq_m={m} must divide the embedding dimension {self._dim}")
+                index = faiss.IndexIVFPQ(
+                    quantizer, self._dim, nlist, m, self.config.pq_nbits, faiss.METRIC_INNER_PRODUCT
+                )
+            sample_size = min(n, 256 * nlist)
+            sample = vectors[np.random.default_rng(0).choice(n, sample_size, replace=False)]
+            index.train(np.ascontiguousarray(sample, dtype=np.float32))
+            index.nprobe = self.config.nprobe
+            return index
+
+        raise ValueError(f"Unknown index_type: {self.config.index_type}")
+
+    def _gpu_device(self, faiss) -> Optional[int]:
+        """GPU id to use when the embedder runs on CUDA and faiss was built with GPU support."""
+        if not self.embedder.device.startswith("cuda"):
+            return None
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return None
+        if self._gpu_resources is None:
+            self._gpu_resources = faiss.StandardGpuResources()
+            self._gpu_resources.setTempMemory(self._GPU_TEMP_MEMORY)
+        return int(self.embedder.device.partition(":")[2] or 0)
+
+    def _to_device(self, faiss, index):
+        """Move the index to GPU when one is available (see `_gpu_device`)."""
+        # faiss has no GPU implementation of HNSW or of flat (non-IVF) scalar quantization.
+        if isinstance(index, (faiss.IndexHNSW, faiss.IndexScalarQuantizer)):
+            return index
+        device_id = self._gpu_device(faiss)
+        if device_id is None:
+            return index
+        return faiss.index_cpu_to_gpu(self._gpu_resources, device_id, index)
 
     def retrieve(self, query: str, entry_entities: List[str]) -> RetrievalResult:
+        graph_future = self._pool.submit(self._graph_expand, entry_entities)
         semantic_hits = self._semantic_search(query)
-        graph_hits = self._graph_expand(entry_entities)
+        graph_hits = graph_future.result()
+        merged = self._merge(semantic_hits, graph_hits)
+        return RetrievalResult(semantic=semantic_hits, graph=graph_hits, merged=merged)
+
+    async def aretrieve(self, query: str, entry_entities: List[str]) -> RetrievalResult:
+        """Async `retrieve`: encoding, FAISS search and graph expansion run on worker threads.
+
+        Concurrent calls interleave on the event loop, so one query's encoding overlaps another's
+        search instead of blocking the loop for the whole retrieval.
+        """
+        graph_task = asyncio.ensure_future(asyncio.to_thread(self._graph_expand, entry_entities))
+        try:
+            await asyncio.to_thread(self.flush)
+            semantic_hits: List[RetrievedChunk] = []
+            if self._chunks:
+                q_vecs = await asyncio.to_thread(self._embed_queries, [query])
+                semantic_hits = (await asyncio.to_thread(self._search, q_vecs))[0]
+            graph_hits = await graph_task
+        except BaseException:
+            # Semantic side failed or was cancelled: stop and collect the graph task so neither
+            # its Neo4j call nor its exception is left dangling.
+            graph_task.cancel()
+            await asyncio.gather(graph_task, return_exceptions=True)
+            raise
         merged = self._merge(semantic_hits, graph_hits)
         return RetrievalResult(semantic=semantic_hits, graph=graph_hits, merged=merged)
 
+    def retrieve_batch(self, queries: Sequence[str], entry_entities: Sequence[List[str]]) -> List[RetrievalResult]:
+        """Retrieve for many queries with one encoder call and one FAISS search."""
+        graph_futures = [self._pool.submit(self._graph_expand, entities) for entities in entry_entities]
+        self.flush()
+        semantic = self._search(self._embed_queries(queries)) if queries else []
+        results: List[RetrievalResult] = []
+        for semantic_hits, graph_future in zip(semantic, graph_futures):
+            graph_hits = graph_future.result()
+            merged = self._merge(semantic_hits, graph_hits)
+            results.append(RetrievalResult(semantic=semantic_hits, graph=graph_hits, merged=merged))
+        return results
+
+    def _embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Return a (len(queries), dim) float32 matrix, encoding only the queries not cached."""
+        model = self.embedder.model_name
+        cache = self._query_cache
+        found: Dict[str, np.ndarray] = {}
+        with self._query_cache_lock:
+            for query in queries:
+                row = cache.get((model, query))
+                if row is not None:
+                    found[query] = row
+                    cache.move_to_end((model, query))
+        misses = [q for q in dict.fromkeys(queries) if q not in found]
+
+        if misses:
+            # Encoded outside the lock so concurrent callers are not serialized on the model.
+            vectors = self.embedder.encode(misses)
+            if vectors.ndim != 2:
+                raise ValueError("Embedder returned invalid shape for query vectors.")
+            if not self.embedder.normalize:
+                _import_faiss().normalize_L2(vectors)
+            found.update(zip(misses, vectors))
+            if self.config.query_cache_size > 0:
+                with self._query_cache_lock:
+                    cache.update(((model, q), found[q]) for q in misses)
+                    while len(cache) > self.config.query_cache_size:
+                        cache.popitem(last=False)
+
+        return np.ascontiguousarray(np.stack([found[q] for q in queries]), dtype=np.float32)
+
     def _semantic_search(self, query: str) -> List[RetrievedChunk]:
-        if not self._faiss_index or not self._chunk_ids:
+        self.flush()
+        if not self._chunks:
             return []
-        q_vec = np.asarray(self.embedder.encode([query]), dtype=np.float32)
-        if q_vec.ndim != 2:
-            return []
-        scores, idxs = self._faiss_index.search(q_vec, min(self.config.top_k_vectors, len(self._chunk_ids)))  # type: ignore[arg-type]
-        hits: List[RetrievedChunk] = []
-        for score, idx in zip(scores[0], idxs[0]):
-            if idx < 0 or idx >= len(self._chunk_ids):
-                continue
-            chunk_id = self._chunk_ids[idx]
-            chunk = self._id_to_chunk.get(chunk_id)
-            if not chunk:
-                continue
-            hits.append(RetrievedChunk(chunk=chunk, score=float(score)))
-        return hits
+        return self._search(self._embed_queries([query]))[0]
+
+    def _search(self, q_vecs: np.ndarray) -> List[List[RetrievedChunk]]:
+        """Search the index for every row of `q_vecs`; FAISS parallelizes over the batch."""
+        if not self._chunks:
+            return [[] for _ in range(len(q_vecs))]
+        k = min(self.config.top_k_vectors, len(self._chunks))
+        if self._vectors is not None:
+            scores, idxs = self._knn(q_vecs, k)
+            lookup = self._chunks  # knn returns row positions
+        else:
+            scores, idxs = self._faiss_index.search(q_vecs, k)  # type: ignore[arg-type]
+            lookup = self._int_to_chunk  # IDMap2 returns int_ids
+        results: List[List[RetrievedChunk]] = []
+        for row_scores, row_ids in zip(scores.tolist(), idxs.tolist()):
+            # Positional construction skips keyword binding in the slots __init__.
+            results.append([RetrievedChunk(lookup[idx], score) for score, idx in zip(row_scores, row_ids) if idx >= 0])
+        return results
+
+    def _knn(self, q_vecs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact inner-product top-k over the owned matrix, scanning row shards in parallel.
+
+        faiss.knn parallelizes over queries, so a single query would scan on one core; splitting
+        the rows into shards (one thread each, GIL released) spreads that scan across cores.
+        """
+        faiss = _import_faiss()
+        vectors = self._vectors[: self._n_vectors]
+        if self._gpu_flat is None and self._gpu_device(faiss) is not None:
+            # Brute force on GPU is one cuBLAS GEMM; the matrix is uploaded once and kept in sync.
+            self._gpu_flat = self._to_device(faiss, faiss.IndexFlatIP(self._dim))
+            self._gpu_flat.add(vectors)
+        if self._gpu_flat is not None:
+            return self._gpu_flat.search(q_vecs, k)
+
+        n = len(vectors)
+        shards = self.config.search_shards
+        if shards is None:
+            shards = min(os.cpu_count() or 1, n // self._MIN_SHARD_ROWS)
+        shards = max(1, min(shards, n))
+        if shards == 1:
+            return faiss.knn(q_vecs, vectors, k, metric=faiss.METRIC_INNER_PRODUCT)
+
+        if self._shard_pool is None:
+            self._shard_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="knn-shard")
+        bounds = np.linspace(0, n, shards + 1, dtype=np.int64)
+
+        def scan(lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+            d, i = faiss.knn(q_vecs, vectors[lo:hi], min(k, hi - lo), metric=faiss.METRIC_INNER_PRODUCT)
+            return d, np.where(i >= 0, i + lo, -1)
+
+        parts = list(self._shard_pool.map(scan, bounds[:-1].tolist(), bounds[1:].tolist()))
+        scores = np.concatenate([d for d, _ in parts], axis=1)
+        idxs = np.concatenate([i for _, i in parts], axis=1)
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(idxs, top, axis=1)
 
     def _graph_expand(self, entry_entities: List[str]) -> List[RetrievedChunk]:
+        """Chunks mentioning the query entities, then their graph neighbors, up to `top_k_graph`.
+
+        Entities resolve to seed chunks through the in-memory mention index, so Neo4j is only asked
+        for the traversal. Entries that are already chunk ids are used as seeds directly.
+        """
         if not entry_entities:
             return []
-        node_ids = self.graph_store.neighbors(entry_entities, max_hops=2, limit=self.config.top_k_graph)
+        limit = self.config.top_k_graph
+        seeds: Dict[str, None] = {}
+        for entry in entry_entities:
+            if entry in self._id_to_chunk:
+                seeds[entry] = None
+            for chunk_id in self._entity_chunks.get(entry.lower(), ()):
+                seeds[chunk_id] = None
+        if not seeds:
+            return []
+
+        hit_ids = list(seeds)[:limit]
+        if len(hit_ids) < limit:
+            neighbor_ids = self.graph_store.neighbors(list(seeds), max_hops=2, limit=limit)
+            hit_ids.extend(nid for nid in neighbor_ids if nid not in seeds)
         hits: List[RetrievedChunk] = []
-        for node_id in node_ids:
+        for node_id in hit_ids[:limit]:
             chunk = self._id_to_chunk.get(node_id)
-            if not chunk:
-                continue
-            hits.append(RetrievedChunk(chunk=chunk, score=1.0))
+            if chunk is not None:
+                hits.append(RetrievedChunk(chunk=chunk, score=1.0))
         return hits
 
     def _merge(self, semantic: List[RetrievedChunk], graph: List[RetrievedChunk]) -> List[RetrievedChunk]:
-        merged = {hit.chunk.id: hit for hit in semantic}
-        for hit in graph:
-            if hit.chunk.id in merged:
-                merged[hit.chunk.id].score = (
-                    self.config.alpha_semantic * merged[hit.chunk.id].score
-                    + (1 - self.config.alpha_semantic) * hit.score
-                )
-            else:
-                merged[hit.chunk.id] = hit
-        merged_list = list(merged.values())
-        merged_list.sort(key=lambda x: x.score, reverse=True)
-        return merged_list
+        """Fuse both hit lists by chunk: alpha-blend where a chunk is in both, else keep its one score.
+
+        Each list holds a chunk at most once (FAISS ids and DISTINCT graph results), so grouping by
+        int_id and summing per source yields each source's score directly.
+        """
+        hits = semantic + graph
+        if not hits:
+            return []
+        n_sem = len(semantic)
+        keys = np.fromiter((h.chunk.int_id for h in hits), dtype=np.int64, count=len(hits))
+        scores = np.fromiter((h.score for h in hits), dtype=np.float32, count=len(hits))
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        m = len(first)
+        # np.unique numbers groups by int_id; renumber them by first appearance so ties keep merged order.
+        rank = np.argsort(first, kind="stable")
+        relabel = np.empty(m, dtype=np.intp)
+        relabel[rank] = np.arange(m)
+        first, inverse = first[rank], relabel[inverse]
+        sem_scores = np.bincount(inverse[:n_sem], weights=scores[:n_sem], minlength=m)
+        graph_scores = np.bincount(inverse[n_sem:], weights=scores[n_sem:], minlength=m)
+        in_both = (np.bincount(inverse[:n_sem], minlength=m) > 0) & (np.bincount(inverse[n_sem:], minlength=m) > 0)
+        alpha = self.config.alpha_semantic
+        fused = np.where(in_both, alpha * sem_scores + (1 - alpha) * graph_scores, sem_scores + graph_scores)
+
+        k = self.config.top_k_merged
+        k = m if k is None else max(0, min(k, m))
+        order = np.sort(np.argpartition(-fused, k - 1)[:k]) if 0 < k < m else np.arange(k)
+        order = order[np.argsort(-fused[order], kind="stable")]
+        return [RetrievedChunk(hits[j].chunk, score) for j, score in zip(first[order].tolist(), fused[order].tolist())]